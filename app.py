@@ -1,9 +1,15 @@
-import os, re, json, logging, tempfile
+import os, io, re, logging, bisect, hashlib, itertools, threading, functools
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Tuple
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from flask import Flask, render_template, request, send_file, abort, Response, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from jinja2 import FileSystemBytecodeCache
 from dotenv import load_dotenv
 from markupsafe import escape
 from docx import Document
@@ -14,6 +20,7 @@ from flask_limiter.util import get_remote_address
 
 # Caching
 from cachetools import TTLCache
+from cachetools.keys import hashkey
 
 
 
@@ -21,11 +28,28 @@ load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "").strip()
 APP_API_KEY  = os.getenv("APP_API_KEY", "").strip()   # optional
+# Public endpoint by default; point at a self-hosted server (see
+# languagetool/server.properties) to drop the internet RTT and rate limits
 LT_API_URL   = os.getenv("LT_API_URL", "https://api.languagetool.org/v2/check").strip()
 
 MAX_TEXT_CHARS = int(os.getenv("MAX_TEXT_CHARS", "12000"))
 MAX_FILE_MB    = int(os.getenv("MAX_FILE_MB", "3"))
 MAX_FILE_BYTES = MAX_FILE_MB * 1024 * 1024
+DOCX_MIMETYPE  = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+LINE_WORKERS   = int(os.getenv("LINE_WORKERS", "8"))
+GROQ_BATCH_LINES = int(os.getenv("GROQ_BATCH_LINES", "20"))
+GROQ_SPLIT_MIN_LINES = int(os.getenv("GROQ_SPLIT_MIN_LINES", "8"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+MIN_CHECK_LETTERS = int(os.getenv("MIN_CHECK_LETTERS", "4"))
+GROQ_CONCURRENCY = int(os.getenv("GROQ_CONCURRENCY", "8"))
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "3"))
+GROQ_TIMEOUT   = float(os.getenv("GROQ_TIMEOUT", "30"))
+# (connect, read): an unreachable LT fails in 2s, while a whole-document
+# batch still gets the full read budget it had before
+LT_TIMEOUT     = (float(os.getenv("LT_CONNECT_TIMEOUT", "2")), float(os.getenv("LT_READ_TIMEOUT", "10")))
+# Optional on-disk cache tier, shared by all workers and kept across restarts
+CACHE_DIR      = os.getenv("CACHE_DIR", "").strip()
+DISK_CACHE_TTL = int(os.getenv("DISK_CACHE_TTL", str(60 * 60 * 24)))   # 1 day
 
 # -----------------------------
 # 2) LOGGING
@@ -43,47 +67,174 @@ groq_client = None
 if GROQ_API_KEY:
     try:
         from groq import Groq
-        groq_client = Groq(api_key=GROQ_API_KEY)
+        # The SDK retries 408/409/429/5xx and connection errors itself, with
+        # jittered exponential backoff that honours Retry-After
+        groq_client = Groq(api_key=GROQ_API_KEY, max_retries=GROQ_MAX_RETRIES, timeout=GROQ_TIMEOUT)
         log.info("Groq Loaded Successfully")
     except Exception as e:
         log.exception("Groq Init Error: %s", e)
 else:
     log.warning("GROQ_API_KEY missing/empty: Groq features disabled")
 
+# Caps in-flight completions per process (line_pool chunks plus request
+# threads), so a long document can't burst past Groq's rate limit
+groq_slots = threading.BoundedSemaphore(GROQ_CONCURRENCY)
+
+def groq_chat(prompt: str, max_tokens: int, temperature: float = 0) -> str:
+    """One chat completion; returns the stripped reply text. Raises on API errors."""
+    with groq_slots:
+        response = groq_client.chat.completions.create(
+            model="llama-3.3-70b-versatile",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+    return (response.choices[0].message.content or "").strip()
+
 # -----------------------------
 # 4) FLASK APP
 # -----------------------------
+class OrjsonProvider(JSONProvider):
+    """jsonify() and request.get_json() through orjson instead of stdlib json."""
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.config["MAX_CONTENT_LENGTH"] = MAX_FILE_BYTES
+app.config["PROPAGATE_EXCEPTIONS"] = True   # let gunicorn log unhandled errors
 CORS(app)
 
+# Templates only change on deploy: skip the per-render mtime check and
+# keep compiled templates across restarts (FLASK_DEBUG=1 keeps reloading)
+if not app.debug:
+    app.config["TEMPLATES_AUTO_RELOAD"] = False
+    app.jinja_env.auto_reload = False
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(os.getenv("JINJA_CACHE_DIR") or None)
+
+# In-memory counts are per process; with WEB_CONCURRENCY > 1 set e.g.
+# RATELIMIT_STORAGE_URI=redis://... so all workers share one budget
 limiter = Limiter(
     get_remote_address,
     app=app,
-    default_limits=["60 per minute"]
+    default_limits=["60 per minute"],
+    storage_uri=os.getenv("RATELIMIT_STORAGE_URI", "memory://")
 )
 
 # -----------------------------
 # 5) CACHES
 # -----------------------------
-lt_cache   = TTLCache(maxsize=2000, ttl=60 * 30)   # 30 min
-groq_cache = TTLCache(maxsize=2000, ttl=60 * 60)   # 60 min
-gen_cache  = TTLCache(maxsize=200, ttl=60 * 30)
-
+disk_cache = None
+if CACHE_DIR:
+    try:
+        from diskcache import Cache
+        disk_cache = Cache(CACHE_DIR)   # SQLite-backed, safe across processes
+        log.info("Disk cache at %s", CACHE_DIR)
+    except Exception as e:
+        log.warning("Disk cache disabled: %s", e)
+
+class DiskBackedTTLCache(TTLCache):
+    """TTLCache with disk_cache as a second tier; disk keys are blake2b digests."""
+    def __init__(self, maxsize: int, ttl: float, prefix: str):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.prefix = prefix
+
+    def disk_key(self, key: Any) -> str:
+        return self.prefix + hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+
+    def disk_get(self, key: Any) -> Any:
+        if disk_cache is None:
+            return None
+        try:
+            return disk_cache.get(self.disk_key(key))
+        except Exception as e:
+            log.warning("Disk cache read error: %s", e)
+            return None
+
+    def disk_set(self, key: Any, value: Any) -> None:
+        if disk_cache is None:
+            return
+        try:
+            disk_cache.set(self.disk_key(key), value, expire=DISK_CACHE_TTL)
+        except Exception as e:
+            log.warning("Disk cache write error: %s", e)
+
+lt_cache   = DiskBackedTTLCache(maxsize=2000, ttl=60 * 30, prefix="lt:")     # 30 min
+groq_cache = DiskBackedTTLCache(maxsize=2000, ttl=60 * 60, prefix="groq:")   # 60 min
+gen_cache  = TTLCache(maxsize=200, ttl=60 * 30)   # sampled output, not worth keeping
+
+# TTLCache is not thread-safe and lines are processed on a thread pool.
+# Only in-memory access happens under the lock; disk I/O stays outside it
+cache_lock = threading.Lock()
+
+def cache_get(cache: TTLCache, key: Any) -> Any:
+    with cache_lock:
+        value = cache.get(key)
+    if value is None and isinstance(cache, DiskBackedTTLCache):
+        value = cache.disk_get(key)
+        if value is not None:
+            with cache_lock:
+                cache[key] = value
+    return value
+
+def cache_set(cache: TTLCache, key: Any, value: Any) -> None:
+    with cache_lock:
+        cache[key] = value
+    if isinstance(cache, DiskBackedTTLCache):
+        cache.disk_set(key, value)
+
+# Shared keep-alive session: one TCP+TLS handshake per pooled connection
+# instead of one per LanguageTool call. Every gunicorn thread may hold a
+# connection at once, so keep HTTP_POOL_SIZE >= GUNICORN_THREADS; extra
+# connections beyond it are opened and then thrown away, not reused.
 http = requests.Session()
+http_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=HTTP_POOL_SIZE,
+    # The public LT endpoint answers 429/503 when throttled; a check is
+    # idempotent, so POSTs are retried too. read=0 and ignoring Retry-After
+    # (uncapped in urllib3) keep a slow LT from holding the request thread
+    max_retries=Retry(
+        total=3,
+        read=0,
+        backoff_factor=0.3,
+        respect_retry_after_header=False,
+        status_forcelist=(429, 502, 503),
+        allowed_methods=frozenset({"GET", "POST"}),
+    ),
+)
+# http:// too, for a self-hosted LanguageTool on localhost
+http.mount("https://", http_adapter)
+http.mount("http://", http_adapter)
+
+# Per-line Groq calls are network-bound, so threads overlap them well
+line_pool = ThreadPoolExecutor(max_workers=LINE_WORKERS, thread_name_prefix="line")
 
 # -----------------------------
 # 6) BLACKLAW LOAD
 # -----------------------------
+_NORM_RE = re.compile(r"[^a-z\s]")
+
+def normalize_key(word: str) -> str:
+    return _NORM_RE.sub("", word.lower()).strip()
+
 try:
-    with open("blacklaw_terms.json", "r", encoding="utf-8") as f:
-        BLACKLAW = json.load(f)
+    # orjson parses the raw bytes several times faster than json.load
+    with open("blacklaw_terms.json", "rb") as f:
+        BLACKLAW = orjson.loads(f.read())
 except Exception:
     BLACKLAW = {}
     log.warning("blacklaw_terms.json not found/invalid. Meanings disabled.")
 
-def normalize_key(word: str) -> str:
-    return re.sub(r"[^a-z\s]", "", word.lower().strip())
+# Lookups always go through normalize_key, so normalize the keys once here
+BLACKLAW_NORM = {}
+for _term, _meaning in BLACKLAW.items():
+    _key = normalize_key(_term)
+    if _key:
+        BLACKLAW_NORM.setdefault(_key, _meaning)
 
 # -----------------------------
 # 7) LEGAL FIXES
@@ -96,8 +247,36 @@ LEGAL_FIX = {
     "audi alteram partum": "audi alteram partem",
 }
 
+# Black's Law meaning of each fix, looked up once here instead of per hit
+LEGAL_MEANING = {w: BLACKLAW_NORM.get(normalize_key(c), "") for w, c in LEGAL_FIX.items()}
+
+# All LEGAL_FIX phrases in one alternation (longest first), compiled once:
+# a single scan per line instead of one search per phrase. The keys are
+# lowercase and detect_legal() scans a lowercased line, so no IGNORECASE
+LEGAL_RE = re.compile(
+    r"\b(?:" + "|".join(re.escape(w) for w in sorted(LEGAL_FIX, key=len, reverse=True)) + r")\b"
+)
+
 # ✅ CHANGE: Do NOT ignore any words (tenses words included)
-IGNORE_WORDS = set()
+# Lowercase; applied once in lt_words(), where LT flags are read
+IGNORE_WORDS = frozenset()
+
+# "[12]" style markers or "(Author, 2019)" style citations
+IS_REF_RE = re.compile(r"^(?:\[\d+\]|\(.+\d{4}.*\))$")
+
+@functools.lru_cache(maxsize=1024)
+def word_re(word: str) -> re.Pattern:
+    """Case-insensitive whole-word pattern, compiled once per distinct word."""
+    return any_word_re([word])
+
+def any_word_re(words) -> re.Pattern:
+    """
+    Case-insensitive alternation over `words` (longest first) so a single
+    scan finds them all. Lookarounds (not \\b) keep words that start or
+    end with punctuation, such as "etc.", matchable.
+    """
+    alternation = "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alternation})(?!\w)", re.IGNORECASE)
 
 def is_reference_like(line: str) -> bool:
     s = line.strip()
@@ -106,10 +285,13 @@ def is_reference_like(line: str) -> bool:
         or "http" in s
         or "www." in s
         or "doi" in s.lower()
-        or re.match(r"^\[\d+\]$", s)
-        or re.match(r"^\(.+\d{4}.*\)$", s)
+        or IS_REF_RE.match(s)
     )
 
+def too_short_to_check(line: str) -> bool:
+    """Headings like "1." or "IV", page numbers, rules: nothing for LT to find."""
+    return sum(c.isalpha() for c in line) < MIN_CHECK_LETTERS
+
 # -----------------------------
 # 8) SIMPLE AUTH (optional)
 # -----------------------------
@@ -131,62 +313,146 @@ def require_api_key():
 # -----------------------------
 # 9) LANGUAGETOOL
 # -----------------------------
-def lt_check_sentence(sentence: str) -> Dict[str, Any]:
-    sentence = sentence.strip()
-    if not sentence:
-        return {"matches": []}
+LT_LINE_SEP = "\n\n"
+
+def lt_request(text: str) -> List[Dict[str, Any]]:
+    """POST text to LanguageTool and return its matches (raises on failure)."""
+    data = {"text": text, "language": "en-US"}
+    r = http.post(LT_API_URL, data=data, timeout=LT_TIMEOUT)
+    r.raise_for_status()
+    return orjson.loads(r.content).get("matches", [])
+
+def utf16_len(s: str) -> int:
+    """Length in UTF-16 code units, the unit LT (Java) reports offsets in."""
+    return len(s.encode("utf-16-le")) // 2
+
+def utf16_to_index(s: str, units: int) -> int:
+    """str index of the character that starts `units` UTF-16 units into `s`."""
+    if s.isascii():
+        return units
+    i = n = 0
+    for ch in s:
+        if n >= units:
+            break
+        n += 2 if ord(ch) > 0xFFFF else 1
+        i += 1
+    return i
+
+def lt_check_lines(lines: List[str]) -> List[List[Dict[str, Any]]]:
+    """
+    LanguageTool matches for every line, offsets relative to the line.
+    Uncached checkable lines go out in one request; results are cached per line.
+    """
+    by_line = [[] for _ in lines]
 
-    if sentence in lt_cache:
-        return lt_cache[sentence]
+    todo = {}   # uncached line text -> indexes where it occurs
+    for idx, line in enumerate(lines):
+        if is_reference_like(line) or too_short_to_check(line):
+            continue
+        cached = cache_get(lt_cache, line)
+        if cached is not None:
+            by_line[idx] = cached
+        else:
+            todo.setdefault(line, []).append(idx)
+
+    if not todo:
+        return by_line
+
+    # Blank line between entries: LT sees each line as its own paragraph,
+    # so sentence/capitalisation rules never run across two lines
+    batch = list(todo)
+    # LT offsets are Java string indices (UTF-16 units)
+    line_starts = list(itertools.accumulate((utf16_len(l) + len(LT_LINE_SEP) for l in batch), initial=0))
+    found = [[] for _ in batch]
 
     try:
-        data = {"text": sentence, "language": "en-US"}
-        r = http.post(LT_API_URL, data=data, timeout=10)
-        r.raise_for_status()
-        out = r.json()
+        for m in lt_request(LT_LINE_SEP.join(batch)):
+            i = bisect.bisect_right(line_starts, m["offset"]) - 1
+            local = m["offset"] - line_starts[i]
+            start = utf16_to_index(batch[i], local)
+            end = utf16_to_index(batch[i], local + m["length"])
+            found[i].append({**m, "offset": start, "length": end - start})
     except Exception as e:
+        # Not cached: the next request retries these lines
         log.warning("LT error: %s", e)
-        out = {"matches": []}
+        return by_line
 
-    lt_cache[sentence] = out
-    return out
+    for line, matches in zip(batch, found):
+        cache_set(lt_cache, line, matches)
+        for idx in todo[line]:
+            by_line[idx] = matches
+
+    return by_line
 
 # -----------------------------
 # 10) LEGAL DETECTOR
 # -----------------------------
 def detect_legal(sentence: str) -> List[Tuple[str, str, str]]:
-    results = []
-    for wrong, correct in LEGAL_FIX.items():
-        if re.search(rf"\b{re.escape(wrong)}\b", sentence, re.IGNORECASE):
-            meaning = BLACKLAW.get(normalize_key(correct), "")
-            results.append((wrong, correct, meaning))
-    return results
+    results = {}
+    for m in LEGAL_RE.finditer(sentence.lower()):
+        wrong = m.group(0)
+        if wrong not in results:
+            results[wrong] = (wrong, LEGAL_FIX[wrong], LEGAL_MEANING[wrong])
+    return list(results.values())
 
 # -----------------------------
 # 11) GROQ WORD-ONLY CHECK (safe JSON)
 # -----------------------------
-def groq_word_check(sentence: str, lt_wrong_words: List[str]) -> List[Dict[str, str]]:
-    if (not groq_client) or (not lt_wrong_words):
-        return []
+LEGAL_FIX_PROMPT = """
+Apply these exact legal fixes if present:
+- suo moto → suo motu
+- prima facia → prima facie
+- mens reaa → mens rea
+- ratio decedendi → ratio decidendi
+- audi alteram partum → audi alteram partem
+""".strip()
 
+def word_check_key(sentence: str, words: Tuple[str, ...]) -> Tuple:
+    # Whitespace-only differences (indent, "\r", double spaces) share an entry
+    return hashkey("WORD", " ".join(sentence.split()), words)
+
+def canonical_words(lt_wrong_words: List[str]) -> Tuple[str, ...]:
     # ✅ CHANGE: No ignore filtering; only de-duplicate
-    lt_wrong_words = list(dict.fromkeys([w.strip() for w in lt_wrong_words if w.strip()]))
-    if not lt_wrong_words:
+    # Sorted so the same sentence/words always hit the same cache entry
+    return tuple(sorted({w.strip() for w in lt_wrong_words if w.strip()}))
+
+_TRAILING_COMMA_RE = re.compile(r",\s*]")
+
+def parse_json_array(raw: str) -> List[Any]:
+    # First "[" to last "]": the model sometimes wraps the array in prose
+    start, end = raw.find("["), raw.rfind("]")
+    if start == -1 or end < start:
         return []
 
-    cache_key = "WORD||" + sentence + "||" + "|".join(sorted([w.lower() for w in lt_wrong_words]))
-    if cache_key in groq_cache:
-        return groq_cache[cache_key]
+    json_str = _TRAILING_COMMA_RE.sub("]", raw[start:end + 1])
+    arr = orjson.loads(json_str)
+    return arr if isinstance(arr, list) else []
+
+def clean_fixes(arr: List[Any]) -> List[Dict[str, str]]:
+    cleaned = []
+    for item in arr:
+        if not isinstance(item, dict):
+            continue
+        w = str(item.get("wrong", "")).strip()
+        s = str(item.get("suggestion", "")).strip()
+        if w and s and w.lower() !=s.lower():
+            cleaned.append({"wrong": w, "suggestion": s})
+    return cleaned
+
+def _groq_word_check_cached(sentence: str, words: Tuple[str, ...]) -> List[Dict[str, str]]:
+    """
+    Memoized Groq call, keyed on (sentence, canonical word tuple).
+    Raises on API/parse errors so failures are never cached.
+    """
+    key = word_check_key(sentence, words)
+    hit = cache_get(groq_cache, key)
+    if hit is not None:
+        return hit
 
     prompt = f"""
-Only correct these words (do NOT rewrite the whole sentence): {lt_wrong_words}
+Only correct these words (do NOT rewrite the whole sentence): {list(words)}
 
-Apply these exact legal fixes if present:
-- suo moto → suo motu
-- prima facia → prima facie
-- mens reaa → mens rea
-- ratio decedendi → ratio decidendi
-- audi alteram partum → audi alteram partem
+{LEGAL_FIX_PROMPT}
 
 Output ONLY valid JSON array exactly like:
 [{{"wrong":"old","suggestion":"new"}}]
@@ -194,42 +460,104 @@ Output ONLY valid JSON array exactly like:
 Sentence: "{sentence}"
 """.strip()
 
+    raw = groq_chat(prompt, max_tokens=350)
+    fixes = clean_fixes(parse_json_array(raw))
+    cache_set(groq_cache, key, fixes)
+    return fixes
+
+def groq_word_check(sentence: str, lt_wrong_words: List[str]) -> List[Dict[str, str]]:
+    if (not groq_client) or (not lt_wrong_words):
+        return []
+
+    words = canonical_words(lt_wrong_words)
+    if not words:
+        return []
+
     try:
-        response = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0,
-            max_tokens=350
-        )
-        raw = response.choices[0].message.content.strip()
+        return _groq_word_check_cached(sentence, words)
+    except Exception as e:
+        log.warning("Groq word-check error: %s", e)
+        return []
 
-        m = re.search(r"\[(?:.|\n)*\]", raw)
-        if not m:
-            groq_cache[cache_key] = []
-            return []
+def _groq_word_check_chunk(batch: List[Tuple[Tuple, Tuple[str, Tuple[str, ...]]]]) -> None:
+    """
+    One chat completion for up to GROQ_BATCH_LINES (key, (sentence, words)) items.
+    Truncated JSON or a 400 retries the batch as two halves while it has
+    more than GROQ_SPLIT_MIN_LINES lines.
+    """
+    blocks = "\n\n".join(
+        f"###LINE {i}###\nWords: {list(words)}\nSentence: \"{sentence}\""
+        for i, (_, (sentence, words)) in enumerate(batch)
+    )
+    prompt = f"""
+For each LINE below, only correct the listed words (do NOT rewrite the sentence).
 
-        json_str = re.sub(r",\s*]", "]", m.group(0))
-        arr = json.loads(json_str)
-        if not isinstance(arr, list):
-            arr = []
+{LEGAL_FIX_PROMPT}
 
-        cleaned = []
-        for item in arr:
-            w = str(item.get("wrong", "")).strip()
-            s = str(item.get("suggestion", "")).strip()
-            if w and s and w.lower() !=s.lower():
-                cleaned.append({"wrong": w, "suggestion": s})
+Output ONLY a valid JSON array with one object per LINE, exactly like:
+[{{"line":0,"fixes":[{{"wrong":"old","suggestion":"new"}}]}}]
 
-        groq_cache[cache_key] = cleaned
-        return cleaned
+{blocks}
+""".strip()
 
+    raw = ""
+    try:
+        raw = groq_chat(prompt, max_tokens=min(4000, 200 + 150 * len(batch)))
+        answered = 0
+        for item in parse_json_array(raw):
+            if not isinstance(item, dict):
+                continue
+            i = item.get("line")
+            if isinstance(i, int) and 0 <= i < len(batch) and isinstance(item.get("fixes"), list):
+                cache_set(groq_cache, batch[i][0], clean_fixes(item["fixes"]))
+                answered += 1
+        if not answered:
+            raise ValueError("no per-line results in reply")
     except Exception as e:
-        log.warning("Groq word-check error: %s", e)
-        return []
+        # A reply with no "[" at all ignored the format; smaller batches
+        # won't change that, so only truncated JSON or a 400 is split
+        too_big = (isinstance(e, ValueError) and "[" in raw) or getattr(e, "status_code", None) == 400
+        if len(batch) > GROQ_SPLIT_MIN_LINES and too_big:
+            log.warning("Groq batch of %d failed, splitting: %s", len(batch), e)
+            mid = len(batch) // 2
+            _groq_word_check_chunk(batch[:mid])
+            _groq_word_check_chunk(batch[mid:])
+        else:
+            log.warning("Groq batch word-check error: %s", e)
+
+def groq_word_check_batch(items: List[Tuple[str, List[str]]]) -> None:
+    """
+    Warm groq_cache for many lines with one chat completion per
+    GROQ_BATCH_LINES lines instead of one per line; the chunks are
+    independent, so they run concurrently on line_pool.
+    items: (sentence, lt_wrong_words). Lines the model skips, or that
+    still fail after splitting, are simply left uncached;
+    groq_word_check() then falls back to the single-line call for them.
+    """
+    if not groq_client:
+        return
+
+    pending = {}
+    for sentence, lt_wrong_words in items:
+        words = canonical_words(lt_wrong_words)
+        key = word_check_key(sentence, words)
+        if words and key not in pending and cache_get(groq_cache, key) is None:
+            pending[key] = (sentence, words)
+
+    todo = list(pending.items())
+    chunks = [todo[i:i + GROQ_BATCH_LINES] for i in range(0, len(todo), GROQ_BATCH_LINES)]
+    if len(chunks) == 1:
+        _groq_word_check_chunk(chunks[0])
+    elif chunks:
+        # list() waits for every chunk before the lines are rendered
+        list(line_pool.map(_groq_word_check_chunk, chunks))
 
 # -----------------------------
 # 12) GROQ FULL REWRITE (tenses+punc+grammar+spelling)
 # -----------------------------
+def rewrite_key(sentence: str) -> str:
+    return "REWRITE||" + sentence.strip()
+
 def groq_rewrite_sentence(sentence: str) -> str:
     """
     Full rewrite => tenses, punctuation, grammar, spelling correction.
@@ -242,9 +570,10 @@ def groq_rewrite_sentence(sentence: str) -> str:
     if not s:
         return s
 
-    cache_key = "REWRITE||" + s
-    if cache_key in groq_cache:
-        return groq_cache[cache_key]
+    cache_key = rewrite_key(s)
+    cached = cache_get(groq_cache, cache_key)
+    if cached is not None:
+        return cached
 
     prompt = f"""
 Rewrite this sentence in correct, clear English.
@@ -265,16 +594,10 @@ Sentence: {s}
 """.strip()
 
     try:
-        response = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0,
-            max_tokens=220
-        )
-        out = (response.choices[0].message.content or "").strip()
+        out = groq_chat(prompt, max_tokens=220)
         if not out:
             out = s
-        groq_cache[cache_key] = out
+        cache_set(groq_cache, cache_key, out)
         return out
     except Exception as e:
         log.warning("Groq rewrite error: %s", e)
@@ -290,8 +613,9 @@ def generate_mistake_paragraph(topic: str = "court case") -> str:
     """
     topic = (topic or "court case").strip()
     cache_key = topic.lower()
-    if cache_key in gen_cache:
-        return gen_cache[cache_key]
+    cached = cache_get(gen_cache, cache_key)
+    if cached is not None:
+        return cached
 
     # fallback (if Groq missing)
     if not groq_client:
@@ -305,7 +629,7 @@ def generate_mistake_paragraph(topic: str = "court case") -> str:
             "procedural irregularities was overlooked and precedent case laws were not analyse, making decision "
             "arbitrary capricious and not sustainable in eyes of law."
         )
-        gen_cache[cache_key] = text
+        cache_set(gen_cache, cache_key, text)
         return text
 
     prompt = f"""
@@ -325,16 +649,10 @@ Output ONLY the paragraph.
 """.strip()
 
     try:
-        r = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=450
-        )
-        out = (r.choices[0].message.content or "").strip()
+        out = groq_chat(prompt, max_tokens=450, temperature=0.7)
         if not out:
             out = "The court take action but the reasoning are not clear and it make many errors."
-        gen_cache[cache_key] = out
+        cache_set(gen_cache, cache_key, out)
         return out
     except Exception as e:
         log.warning("Generate paragraph error: %s", e)
@@ -343,94 +661,204 @@ Output ONLY the paragraph.
 # -----------------------------
 # 14) BUILD HIGHLIGHTED HTML
 # -----------------------------
-def process_text_line_by_line(text: str, mode: str = "word") -> str:
+def grammar_span(shown: str, data: Dict[str, Any]) -> str:
+    """<span> for one flagged word; `shown` is the already-escaped line text."""
+    return (
+        f"<span class='grammar-wrong' "
+        f"data-wrong='{escape(data['original'])}' "
+        f"data-black='{escape(data['black'] or '')}' "
+        f"data-groq='{escape(data['groq'] or '')}' "
+        f"data-meaning='{escape(data['meaning'] or '')}'>"
+        f"{shown}</span>"
+    )
+
+def lt_spans(line: str, lt_matches: List[Dict[str, Any]]) -> Dict[str, Tuple[int, int]]:
+    """First LanguageTool offset of every flagged word, keyed by lowercase text."""
+    spans = {}
+    for m in lt_matches:
+        start = m["offset"]
+        raw = line[start:start + m["length"]]
+        word = raw.strip()
+        if word:
+            start += len(raw) - len(raw.lstrip())
+            spans.setdefault(word.lower(), (start, start + len(word)))
+    return spans
+
+def highlight_line(line: str, combined: Dict[str, Dict[str, Any]],
+                   lt_at: Dict[str, Tuple[int, int]]) -> str:
     """
-    mode:
-      - 'word'   => highlight + suggestions
-      - 'rewrite'=> full corrected lines returned (no highlights)
+    Build the highlighted HTML for one raw line in a single left-to-right pass.
+    Each flagged word sits at the offset LanguageTool reported for it, else at
+    its first whole-word occurrence; spans are sorted by offset, overlapping
+    ones dropped, and the text between them escaped segment by segment.
     """
-    lines = text.split("\n")
-    final_html = []
+    spans = []
+    for key, data in combined.items():
+        pos = lt_at.get(key)
+        if pos is None:
+            m = word_re(data["original"]).search(line)
+            if not m:
+                continue
+            pos = m.span()
+        spans.append((pos[0], pos[1], data))
+    spans.sort(key=lambda s: (s[0], -s[1]))
 
-    for line in lines:
-        if not line.strip():
-            final_html.append("<p></p>")
+    parts, cursor = [], 0
+    for start, end, data in spans:
+        if start < cursor:
             continue
+        parts.append(escape(line[cursor:start]))
+        parts.append(grammar_span(escape(line[start:end]), data))
+        cursor = end
+    parts.append(escape(line[cursor:]))
+
+    return "".join(parts)
+
+def lt_words(line: str, lt_matches: List[Dict[str, Any]]) -> List[str]:
+    """The text LanguageTool flagged in this line."""
+    words = []
+    for m in lt_matches:
+        wrong = line[m["offset"]:m["offset"] + m["length"]]
+        # ✅ CHANGE: no ignore; keep tense words too
+        if wrong.strip() and wrong.strip().lower() not in IGNORE_WORDS:
+            words.append(wrong)
+    return words
+
+def unresolved_words(line: str, lt_matches: List[Dict[str, Any]]) -> List[str]:
+    """
+    LT-flagged words for Groq: those that are not a LEGAL_FIX phrase and
+    don't overlap a legal phrase found in this line.
+    """
+    lowered = line.lower()
+    # lower() changed the length (e.g. "İ"): offsets can't be compared
+    legal = [m.span() for m in LEGAL_RE.finditer(lowered)] if len(lowered) == len(line) else []
+    kept = [
+        m for m in lt_matches
+        if not any(m["offset"] < end and start < m["offset"] + m["length"] for start, end in legal)
+    ]
+    return [w for w in lt_words(line, kept) if w.strip().lower() not in LEGAL_FIX]
+
+def process_line(line: str, lt_matches: List[Dict[str, Any]], mode: str = "word") -> str:
+    """
+    Render a single line as <p>...</p>.
+    lt_matches are this line's LanguageTool matches with line-relative offsets.
+    """
+    if not line.strip():
+        return "<p></p>"
 
-        # XSS safe display
-        safe_line = escape(line)
+    # XSS safe display
+    safe_line = escape(line)
 
-        if is_reference_like(line):
-            final_html.append(f"<p>{safe_line}</p>")
-            continue
+    if is_reference_like(line):
+        return f"<p>{safe_line}</p>"
 
-        working = line
+    working = line
 
-        # FULL REWRITE MODE (tenses + punctuation + grammar + spelling)
-        if mode == "rewrite":
-            corrected = groq_rewrite_sentence(working)
-            final_html.append(f"<p>{escape(corrected)}</p>")
-            continue
+    # FULL REWRITE MODE (tenses + punctuation + grammar + spelling)
+    if mode == "rewrite":
+        corrected = groq_rewrite_sentence(working)
+        return f"<p>{escape(corrected)}</p>"
 
-        # WORD MODE (highlight suggestions)
-        html_line = str(safe_line)
-        lt_res = lt_check_sentence(working)
+    # WORD MODE (highlight suggestions)
+    legal_hits = detect_legal(working)
+    lt_wrong_words = unresolved_words(working, lt_matches)
 
-        lt_wrong_words = []
-        for m in lt_res.get("matches", []):
-            wrong = working[m["offset"]:m["offset"] + m["length"]]
-            # ✅ CHANGE: no ignore; keep tense words too
-            if wrong.strip() and len(wrong.strip()) > 0:
-                lt_wrong_words.append(wrong)
+    # Lines whose flagged words the legal table already covers skip Groq
+    groq_hits  = groq_word_check(working, lt_wrong_words)
 
-        legal_hits = detect_legal(working)
-        groq_hits  = groq_word_check(working, lt_wrong_words)
+    combined = {}
 
-        combined = {}
+    for wrong, correct, meaning in legal_hits:
+        key = wrong.lower()
+        combined[key] = {"original": wrong, "black": correct, "groq": None, "meaning": meaning}
 
-        for wrong, correct, meaning in legal_hits:
-            key = wrong.lower()
-            combined[key] = {"original": wrong, "black": correct, "groq": None, "meaning": meaning}
+    for g in groq_hits:
+        wrong_raw = (g.get("wrong") or "").strip()
+        suggestion = (g.get("suggestion") or "").strip()
+        if not wrong_raw or not suggestion:
+            continue
 
-        for g in groq_hits:
-            wrong_raw = (g.get("wrong") or "").strip()
-            suggestion = (g.get("suggestion") or "").strip()
-            if not wrong_raw or not suggestion:
-                continue
+        key = wrong_raw.lower()
+        if key not in combined:
+            mm = word_re(wrong_raw).search(working)
+            original = mm.group(0) if mm else wrong_raw
+            combined[key] = {"original": original, "black": None, "groq": None, "meaning": ""}
 
-            key = wrong_raw.lower()
-            if key not in combined:
-                mm = re.search(rf"\b{re.escape(wrong_raw)}\b", working, re.IGNORECASE)
-                original = mm.group(0) if mm else wrong_raw
-                combined[key] = {"original": original, "black": None, "groq": None, "meaning": ""}
+        combined[key]["groq"] = suggestion
 
-            combined[key]["groq"] = suggestion
+    if not combined:
+        return f"<p>{safe_line}</p>"
 
-        for _, data in combined.items():
-            original_word = data["original"]
-            black = data["black"] or ""
-            groq  = data["groq"] or ""
-            meaning = data["meaning"] or ""
+    return f"<p>{highlight_line(working, combined, lt_spans(working, lt_matches))}</p>"
 
-            ow = escape(original_word)
-            span = (
-                f"<span class='grammar-wrong' "
-                f"data-wrong='{escape(original_word)}' "
-                f"data-black='{escape(black)}' "
-                f"data-groq='{escape(groq)}' "
-                f"data-meaning='{escape(meaning)}'>"
-                f"{ow}</span>"
-            )
+def needs_groq(line: str, lt_matches: List[Dict[str, Any]], mode: str) -> bool:
+    """True when rendering this line would call Groq (nothing cached for it yet)."""
+    if not groq_client or is_reference_like(line):
+        return False
+    if mode == "rewrite":
+        return cache_get(groq_cache, rewrite_key(line)) is None
+    words = canonical_words(unresolved_words(line, lt_matches))
+    return bool(words) and cache_get(groq_cache, word_check_key(line, words)) is None
 
-            # ✅ CHANGE: stable replace (no regex boundary issues)
-            html_line = html_line.replace(str(ow), span, 1)
+def process_text_line_by_line(text: str, mode: str = "word") -> str:
+    """
+    mode:
+      - 'word'   => highlight + suggestions
+      - 'rewrite'=> full corrected lines returned (no highlights)
+    """
+    lines = text.split("\n")
 
-        final_html.append(f"<p>{html_line}</p>")
+    if mode == "rewrite":
+        lt_by_line = [[] for _ in lines]
+    else:
+        lt_by_line = lt_check_lines(lines)
+        # One Groq round-trip for all flagged lines; process_line then
+        # reads the per-line answers from groq_cache
+        groq_word_check_batch([
+            (line, unresolved_words(line, matches))
+            for line, matches in zip(lines, lt_by_line)
+            if matches and not is_reference_like(line)
+        ])
+
+    # Only lines still waiting on Groq go to the shared pool; the rest render
+    # here, so they never queue behind another request's Groq calls
+    final_html = [None] * len(lines)
+    pending = {}
+    for i, (line, matches) in enumerate(zip(lines, lt_by_line)):
+        if needs_groq(line, matches, mode):
+            pending[i] = line_pool.submit(process_line, line, matches, mode)
+        else:
+            final_html[i] = process_line(line, matches, mode)
+    for i, future in pending.items():
+        final_html[i] = future.result()
 
     return "\n".join(final_html)
 
 # -----------------------------
-# 15) ROUTES
+# 15) RESULT PAGE
+# -----------------------------
+RESULT_SLOT = "\x00highlighted_html\x00"
+
+def _split_result_frame() -> Tuple[str, str]:
+    head, tail = render_template("result.html", highlighted_html=RESULT_SLOT).split(RESULT_SLOT)
+    return head, tail
+
+_cached_result_frame = functools.lru_cache(maxsize=1)(_split_result_frame)
+
+def result_frame() -> Tuple[str, str]:
+    """
+    result.html rendered around a placeholder and split into the markup
+    before/after it; computed once per process unless debug reloading.
+    """
+    return _split_result_frame() if app.debug else _cached_result_frame()
+
+def render_result(highlighted_html: str) -> Response:
+    """Stitch the (already escaped) highlighted HTML into the cached frame."""
+    head, tail = result_frame()
+    return Response(head + highlighted_html + tail, mimetype="text/html")
+
+# -----------------------------
+# 16) ROUTES
 # -----------------------------
 @app.route("/", methods=["GET", "POST"])
 @limiter.limit("20 per minute")
@@ -451,7 +879,7 @@ def index():
             abort(413, description=f"Text too long. Max {MAX_TEXT_CHARS} chars allowed.")
 
         output = process_text_line_by_line(text, mode=mode)
-        return render_template("result.html", highlighted_html=output, mode=mode)
+        return render_result(output)
 
     return render_template("index.html")
 
@@ -488,30 +916,42 @@ def download_corrected():
     # In rewrite mode, final_text is already corrected plain text.
     # In word mode, we still allow replacements.
     try:
-        replacements = json.loads(request.form.get("replacements", "[]"))
+        replacements = orjson.loads(request.form.get("replacements", "[]"))
         if not isinstance(replacements, list):
             replacements = []
     except Exception:
         replacements = []
 
-    doc = Document()
-    for line in final_text.split("\n"):
-        doc.add_paragraph(line)
+    # First replacement wins for a word, like the old sequential re.sub loop
+    table = {}
+    for rep in replacements:
+        if not isinstance(rep, dict):
+            continue
+        wrong = str(rep.get("old", "")).strip()
+        correct = str(rep.get("new", "")).strip()
+        if wrong and correct:
+            table.setdefault(wrong.lower(), correct)
 
-    for para in doc.paragraphs:
-        for rep in replacements:
-            wrong = str(rep.get("old", "")).strip()
-            correct = str(rep.get("new", "")).strip()
-            if not wrong or not correct:
-                continue
-            para.text = re.sub(rf"\b{re.escape(wrong)}\b", correct, para.text, flags=re.IGNORECASE)
+    lines = final_text.split("\n")
+    if table:
+        # One compiled pattern, one scan per line (was one compile+scan per pair)
+        pattern = any_word_re(table)
+        lines = [pattern.sub(lambda m: table.get(m.group(0).lower(), m.group(0)), line) for line in lines]
 
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".docx")
-    tmp_path = tmp.name
-    tmp.close()
+    doc = Document()
+    for line in lines:
+        doc.add_paragraph(line)
 
-    doc.save(tmp_path)
-    return send_file(tmp_path, as_attachment=True, download_name="Corrected_Final_Output.docx")
+    # Build the file in memory: no temp file left behind per download
+    buf = io.BytesIO()
+    doc.save(buf)
+    buf.seek(0)
+    return send_file(
+        buf,
+        as_attachment=True,
+        download_name="Corrected_Final_Output.docx",
+        mimetype=DOCX_MIMETYPE,
+    )
 
 @app.route("/health", methods=["GET"])
 def health():
@@ -534,7 +974,7 @@ def check_grammar():
 # DEV ONLY
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", "5000"))
-    app.run(host="0.0.0.0", port=port, debug=False)
+    app.run(host="0.0.0.0", port=port, debug=app.debug)
 
 
 
@@ -0,0 +1,18 @@
+# Gunicorn settings, read automatically from the working directory.
+# Requests spend nearly all their time waiting on LanguageTool/Groq, so
+# threaded workers (not more processes) provide the concurrency.
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+worker_class = "gthread"
+# One process by default: flask-limiter counts in process memory unless
+# RATELIMIT_STORAGE_URI points at shared storage, so N workers would let
+# each client through N times its limit
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "30"))
+timeout = 120
+
+# Import app.py once in the master: BLACKLAW, compiled regexes and the
+# HTTP session/Groq client are built before fork and shared copy-on-write
+preload_app = True